@@ -2,6 +2,7 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
 import uuid
+import threading
 from models.chatbot import DocumentChatbot
 from werkzeug.utils import secure_filename
 import logging
@@ -16,10 +17,26 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Global storage for user sessions
 user_sessions = {}
+# Guards user_sessions itself; each chatbot carries its own read-write lock
+sessions_lock = threading.Lock()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def get_session(session_id):
+    """Return the chatbot for a session, or None if it does not exist"""
+    with sessions_lock:
+        return user_sessions.get(session_id)
+
+def get_or_create_session(session_id):
+    """Return the chatbot for a session, creating it exactly once"""
+    with sessions_lock:
+        chatbot = user_sessions.get(session_id)
+        if chatbot is None:
+            chatbot = DocumentChatbot(session_id)
+            user_sessions[session_id] = chatbot
+        return chatbot
+
 # Routes
 @app.route('/upload', methods=['POST'])
 def upload_document():
@@ -34,27 +51,27 @@ def upload_document():
         return jsonify({'error': 'No file selected'}), 400
     
     # Get or create chatbot instance
-    if session_id not in user_sessions:
-        user_sessions[session_id] = DocumentChatbot(session_id)
-    
-    chatbot = user_sessions[session_id]
+    chatbot = get_or_create_session(session_id)
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, f"{session_id}_{filename}")
+        # Unique temp name so concurrent uploads of the same file don't collide
+        file_path = os.path.join(UPLOAD_FOLDER, f"{session_id}_{uuid.uuid4().hex}_{filename}")
         file.save(file_path)
         
-        # Process document
-        success, message = chatbot.process_document(file_path, filename)
-        
-        # Clean up uploaded file
-        os.remove(file_path)
+        try:
+            # Process document
+            success, message = chatbot.process_document(file_path, filename)
+        finally:
+            # Clean up uploaded file
+            os.remove(file_path)
         
         if success:
             result = message  # message now contains both message and insights
             return jsonify({
                 'message': result['message'],
                 'insights': result['insights'],
+                'ingestion': result['ingestion'],
                 'session_id': session_id,
                 'documents': chatbot.get_documents()
             })
@@ -73,10 +90,10 @@ def chat():
     if not session_id or not question:
         return jsonify({'error': 'Session ID and question are required'}), 400
     
-    if session_id not in user_sessions:
+    chatbot = get_session(session_id)
+    if chatbot is None:
         return jsonify({'error': 'No documents found for this session'}), 404
     
-    chatbot = user_sessions[session_id]
     response = chatbot.ask_question(question)
     
     return jsonify({'response': response})
@@ -84,26 +101,26 @@ def chat():
 @app.route('/documents/<session_id>', methods=['GET'])
 def get_documents(session_id):
     """Get list of uploaded documents"""
-    if session_id not in user_sessions:
+    chatbot = get_session(session_id)
+    if chatbot is None:
         return jsonify({'documents': []})
     
-    chatbot = user_sessions[session_id]
     return jsonify({'documents': chatbot.get_documents()})
 
 @app.route('/session', methods=['POST'])
 def create_session():
     """Create new session"""
     session_id = str(uuid.uuid4())
-    user_sessions[session_id] = DocumentChatbot(session_id)
+    get_or_create_session(session_id)
     return jsonify({'session_id': session_id})
 
 @app.route('/summary/<session_id>', methods=['GET'])
 def get_document_summary(session_id):
     """Get comprehensive document summary"""
-    if session_id not in user_sessions:
+    chatbot = get_session(session_id)
+    if chatbot is None:
         return jsonify({'error': 'Session not found'}), 404
     
-    chatbot = user_sessions[session_id]
     filename = request.args.get('filename')  # Optional: get summary for specific document
     
     summary = chatbot.get_document_summary(filename)
@@ -112,7 +129,8 @@ def get_document_summary(session_id):
 @app.route('/insights/<session_id>', methods=['POST'])
 def get_insights(session_id):
     """Get contextual insights for a specific question"""
-    if session_id not in user_sessions:
+    chatbot = get_session(session_id)
+    if chatbot is None:
         return jsonify({'error': 'Session not found'}), 404
     
     data = request.json
@@ -121,18 +139,17 @@ def get_insights(session_id):
     if not question:
         return jsonify({'error': 'Question is required'}), 400
     
-    chatbot = user_sessions[session_id]
-    insights = chatbot.insight_generator.generate_contextual_insights(question)
+    insights = chatbot.get_contextual_insights(question)
     
     return jsonify({'insights': insights})
 
 @app.route('/session/<session_id>', methods=['DELETE'])
 def delete_session(session_id):
     """Delete session and cleanup resources"""
-    if session_id in user_sessions:
-        chatbot = user_sessions[session_id]
+    with sessions_lock:
+        chatbot = user_sessions.pop(session_id, None)
+    if chatbot is not None:
         chatbot.cleanup()
-        del user_sessions[session_id]
         return jsonify({'message': 'Session deleted successfully'})
     return jsonify({'error': 'Session not found'}), 404
 
@@ -140,4 +157,4 @@ if __name__ == '__main__':
     # Set your OpenAI API key here or use environment variable
     # os.environ['OPENAI_API_KEY'] = 'your-api-key-here'
     
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    app.run(debug=True, port=5001, threaded=True)
\ No newline at end of file
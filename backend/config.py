@@ -21,6 +21,18 @@ class Config:
     # RAG configuration
     LLM_TEMPERATURE = float(os.environ.get('LLM_TEMPERATURE', '0.7'))
     RETRIEVAL_K = int(os.environ.get('RETRIEVAL_K', '3'))
+    RETRIEVAL_MODE = os.environ.get('RETRIEVAL_MODE', 'adaptive')  # 'adaptive' or 'fixed'
+    RETRIEVAL_MAX_K = int(os.environ.get('RETRIEVAL_MAX_K', '8'))  # Candidate pool in adaptive mode
+    # Adaptive cutoffs are relative to the candidate pool (1 = best candidate, 0 = weakest);
+    # tuned with scripts/evaluate_retrieval.py
+    RETRIEVAL_SCORE_THRESHOLD = float(os.environ.get('RETRIEVAL_SCORE_THRESHOLD', '0.5'))  # Min relative relevance
+    RETRIEVAL_FLAT_SPREAD = float(os.environ.get('RETRIEVAL_FLAT_SPREAD', '0.1'))  # Max gap from best to expand past k
+    
+    # Conversation memory configuration
+    MEMORY_RECENT_TOKENS = int(os.environ.get('MEMORY_RECENT_TOKENS', '300'))  # Recent turns kept verbatim (~2 turns)
+    MEMORY_ANSWER_CHARS = int(os.environ.get('MEMORY_ANSWER_CHARS', '300'))  # Stored prefix of each answer
+    MEMORY_SUMMARY_TOKENS = int(os.environ.get('MEMORY_SUMMARY_TOKENS', '128'))  # Rolling summary of older turns
+    MEMORY_MAX_BYTES = int(os.environ.get('MEMORY_MAX_BYTES', str(64 * 1024)))  # Hard cap per session
     
     # Session configuration
     SESSION_CLEANUP_INTERVAL = timedelta(hours=1)  # Clean up sessions after 1 hour
@@ -1,10 +1,15 @@
 from datetime import datetime
+from config import Config
 from utils.document_processor import DocumentProcessor
 from utils.vector_store import VectorStore
 from utils.rag_pipeline import RAGPipeline
 from utils.insight_generator import InsightGenerator
+from utils.conversation_memory import ConversationMemory
+from utils.locks import ReadWriteLock
 import logging
 
+SESSION_CLOSED_MESSAGE = "This session has been deleted. Please start a new session."
+
 class DocumentChatbot:
     def __init__(self, session_id):
         self.session_id = session_id
@@ -12,10 +17,27 @@ class DocumentChatbot:
         self.vector_store = VectorStore(session_id)
         self.rag_pipeline = RAGPipeline(self.vector_store)
         self.insight_generator = InsightGenerator(self.vector_store)
+        self.memory = ConversationMemory(
+            max_recent_tokens=Config.MEMORY_RECENT_TOKENS,
+            max_summary_tokens=Config.MEMORY_SUMMARY_TOKENS,
+            max_bytes=Config.MEMORY_MAX_BYTES,
+            max_answer_chars=Config.MEMORY_ANSWER_CHARS
+        )
         self.documents = []
+        # Vector store ids of each document's chunks, keyed by filename
+        self.chunk_ids = {}
+        # Questions run in parallel; uploads and cleanup are exclusive
+        self.lock = ReadWriteLock()
+        # Set by cleanup(); requests that were already in flight must not touch the session again
+        self.closed = False
         
     def process_document(self, file_path, filename):
-        """Process uploaded document and add to vector store"""
+        """Process uploaded document and add to vector store.
+
+        Re-uploading a filename already in the session replaces that document:
+        unchanged chunks keep their embeddings, new or edited chunks are
+        embedded, and chunks that disappeared are removed from the store.
+        """
         try:
             # Process document
             success, data = self.document_processor.process_file(file_path, filename)
@@ -23,47 +45,147 @@ class DocumentChatbot:
             if not success:
                 return False, data  # data contains error message
             
-            texts = data  # data contains processed text chunks
+            texts = self._dedupe_chunks(data)  # data contains processed text chunks
+            chunk_ids = [self._chunk_id(filename, text) for text in texts]
             
-            # Add to vector store
-            self.vector_store.add_documents(texts)
+            # Skip the LLM call when an identical version is already stored
+            with self.lock.read_locked():
+                previous = self._find_document(filename)
+                unchanged = previous is not None and set(chunk_ids) == self.chunk_ids.get(filename)
             
-            # Generate document insights
-            doc_insights = self.insight_generator.generate_document_insights(texts, filename)
+            if unchanged:
+                doc_insights = previous['insights']
+            else:
+                # Generate document insights (only reads the new chunks, so no lock needed)
+                doc_insights = self.insight_generator.generate_document_insights(texts, filename)
             
-            # Store document info with insights
-            doc_info = {
-                'filename': filename,
-                'chunks': len(texts),
-                'upload_time': datetime.now().isoformat(),
-                'insights': doc_insights
-            }
-            self.documents.append(doc_info)
+            # Diff against the stored version and update the vector store as one atomic step
+            with self.lock.write_locked():
+                if self.closed:
+                    return False, SESSION_CLOSED_MESSAGE
+                
+                previous = self._find_document(filename)
+                existing_ids = self.chunk_ids.get(filename, set())
+                new_ids = set(chunk_ids)
+                
+                added = [(text, chunk_id) for text, chunk_id in zip(texts, chunk_ids)
+                         if chunk_id not in existing_ids]
+                reused = [(text, chunk_id) for text, chunk_id in zip(texts, chunk_ids)
+                          if chunk_id in existing_ids]
+                removed_ids = existing_ids - new_ids
+                
+                if not self.vector_store.add_documents([text for text, _ in added],
+                                                       ids=[chunk_id for _, chunk_id in added]):
+                    return False, f"Error adding {filename} to vector store"
+                
+                # Reused chunks may have moved page; refresh their metadata so sources stay accurate
+                if not self.vector_store.update_metadata([chunk_id for _, chunk_id in reused],
+                                                         [text.metadata for text, _ in reused]):
+                    logging.warning(f"Sources for {filename} may show outdated page numbers")
+                
+                if not self.vector_store.delete_documents(removed_ids):
+                    # Keep tracking the stale chunks so the next upload retries removal
+                    self.chunk_ids[filename] = new_ids | removed_ids
+                    return False, f"Error removing outdated chunks of {filename} from vector store"
+                
+                self.chunk_ids[filename] = new_ids
+                
+                version = 1
+                if previous is not None:
+                    version = previous['version'] + (1 if added or removed_ids else 0)
+                
+                # Store document info with insights
+                doc_info = {
+                    'filename': filename,
+                    'chunks': len(texts),
+                    'version': version,
+                    'upload_time': datetime.now().isoformat(),
+                    'insights': doc_insights,
+                    'embeddings_reused': len(texts) - len(added),
+                    'embeddings_computed': len(added),
+                    'chunks_removed': len(removed_ids)
+                }
+                
+                if previous is not None:
+                    self.documents[self.documents.index(previous)] = doc_info
+                else:
+                    self.documents.append(doc_info)
             
             return True, {
-                'message': f"Successfully processed {filename} into {len(texts)} chunks",
-                'insights': doc_insights
+                'message': (f"Successfully processed {filename} (version {version}) into {len(texts)} chunks: "
+                            f"{len(added)} embedded, {len(texts) - len(added)} reused, "
+                            f"{len(removed_ids)} removed"),
+                'insights': doc_insights,
+                'ingestion': {
+                    'version': version,
+                    'embeddings_reused': doc_info['embeddings_reused'],
+                    'embeddings_computed': doc_info['embeddings_computed'],
+                    'chunks_removed': doc_info['chunks_removed']
+                }
             }
             
         except Exception as e:
             logging.error(f"Error processing document: {str(e)}")
             return False, f"Error processing document: {str(e)}"
     
+    def _find_document(self, filename):
+        """Return the stored info for a filename, or None"""
+        for doc_info in self.documents:
+            if doc_info['filename'] == filename:
+                return doc_info
+        return None
+    
+    def _chunk_id(self, filename, text):
+        """Vector store id for a chunk: stable across uploads of the same content"""
+        return f"{filename}:{text.metadata['chunk_hash']}"
+    
+    def _dedupe_chunks(self, texts):
+        """Drop repeated chunks within a document; they would share an id"""
+        seen = set()
+        unique = []
+        for text in texts:
+            if text.metadata['chunk_hash'] not in seen:
+                seen.add(text.metadata['chunk_hash'])
+                unique.append(text)
+        return unique
+    
     def ask_question(self, question):
         """Ask a question about the uploaded documents with enhanced insights"""
+        with self.lock.read_locked():
+            if self.closed:
+                return SESSION_CLOSED_MESSAGE
+            return self._ask_question(question)
+    
+    def _ask_question(self, question):
         if not self.vector_store.has_documents():
             return "No documents have been uploaded yet. Please upload a document first."
         
         try:
+            # Resolve follow-ups ("what about the second one?") into a standalone query;
+            # it carries the conversation context, so the answer prompt doesn't repeat the history
+            standalone_question, condense_tokens = self.memory.condense_question(question)
+            
             # Get basic RAG response
-            rag_response = self.rag_pipeline.query(question)
+            rag_response = self.rag_pipeline.query(standalone_question)
             
             # Generate contextual insights based on the question
-            insights = self.insight_generator.generate_contextual_insights(question)
+            insights = self.insight_generator.generate_contextual_insights(standalone_question)
             
             # Combine response with insights
             if isinstance(rag_response, dict):
+                summary_tokens = self.memory.add_turn(question, rag_response['answer'])
+                # Every prompt this turn sent for answering and memory upkeep
+                rag_response['prompt_tokens_breakdown'] = {
+                    'condense': condense_tokens,
+                    'answer': rag_response['prompt_tokens'],
+                    'summary': summary_tokens
+                }
+                if rag_response['prompt_tokens'] is not None:
+                    rag_response['prompt_tokens'] = condense_tokens + rag_response['prompt_tokens'] + summary_tokens
+                rag_response['question'] = question
+                rag_response['standalone_question'] = standalone_question
                 rag_response['insights'] = insights
+                rag_response['memory'] = self.memory.get_stats()
                 return rag_response
             else:
                 return {
@@ -79,16 +201,33 @@ class DocumentChatbot:
     def get_document_summary(self, filename=None):
         """Get comprehensive summary of document(s)"""
         try:
-            return self.insight_generator.generate_document_summary(filename)
+            with self.lock.read_locked():
+                if self.closed:
+                    return SESSION_CLOSED_MESSAGE
+                return self.insight_generator.generate_document_summary(filename)
         except Exception as e:
             logging.error(f"Error generating summary: {str(e)}")
             return f"Error generating summary: {str(e)}"
     
     def get_documents(self):
         """Get list of uploaded documents"""
-        return self.documents
+        with self.lock.read_locked():
+            if self.closed:
+                return []
+            return list(self.documents)
+    
+    def get_contextual_insights(self, question):
+        """Get contextual insights for a question"""
+        with self.lock.read_locked():
+            if self.closed:
+                return {'error': SESSION_CLOSED_MESSAGE}
+            return self.insight_generator.generate_contextual_insights(question)
     
     def cleanup(self):
         """Clean up resources"""
-        self.vector_store.cleanup()
-        self.documents.clear()
\ No newline at end of file
+        with self.lock.write_locked():
+            self.closed = True
+            self.vector_store.cleanup()
+            self.documents.clear()
+            self.chunk_ids.clear()
+            self.memory.clear()
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""Compare fixed and adaptive retrieval on the evaluation set.
+
+Embeds eval/retrieval_eval.json, ranks chunks by cosine similarity (what the
+vector store's cosine space returns) and runs RAGPipeline.retrieve for fixed
+top-k and a grid of adaptive settings. Reports, per setting, the average
+number of chunks and answer-prompt tokens, and recall of the sections that
+answer each question (overall, for single-section lookups, and for broad
+questions) as the answer-quality proxy.
+
+Uses OpenAI embeddings when OPENAI_API_KEY is set, otherwise a local TF-IDF
+embedding so it runs offline. Adaptive mode scores candidates relative to
+the candidate pool, so its settings carry over between embedding models.
+
+Usage (from backend/):
+    python scripts/evaluate_retrieval.py [--embeddings tfidf|openai]
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from langchain_core.documents import Document
+
+from config import Config
+from utils import rag_pipeline
+from utils.rag_pipeline import RAGPipeline
+from measure_conversation_tokens import StubLLM, TOKENIZER, count_tokens
+
+EVAL_SET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'eval', 'retrieval_eval.json')
+
+THRESHOLDS = [0.3, 0.4, 0.5, 0.6, 0.7]
+SPREADS = [0.05, 0.1, 0.15, 0.2]
+
+
+class TfidfEmbeddings:
+    """Offline stand-in for OpenAIEmbeddings; fit on the evaluation chunks"""
+
+    def __init__(self, texts):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        self.vectorizer = TfidfVectorizer(stop_words='english', sublinear_tf=True).fit(texts)
+
+    def embed_documents(self, texts):
+        return self.vectorizer.transform(texts).toarray()
+
+    def embed_query(self, text):
+        return self.vectorizer.transform([text]).toarray()[0]
+
+
+class EvalVectorStore:
+    """Cosine-similarity search over the evaluation chunks"""
+
+    def __init__(self, chunks, embeddings):
+        self.embeddings = embeddings
+        self.docs = [Document(page_content=chunk['text'], metadata={'id': chunk['id']}) for chunk in chunks]
+        self.vectors = self._normalize(np.array(embeddings.embed_documents([doc.page_content for doc in self.docs])))
+
+    def has_documents(self):
+        return True
+
+    def search_with_scores(self, query, k=3):
+        scores = self.vectors @ self._normalize(np.array(self.embeddings.embed_query(query)))
+        order = np.argsort(-scores)[:k]
+        return [(self.docs[i], float(scores[i])) for i in order]
+
+    @staticmethod
+    def _normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+@contextmanager
+def retrieval_config(**settings):
+    previous = {name: getattr(Config, name) for name in settings}
+    for name, value in settings.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(Config, name, value)
+
+
+def evaluate(pipeline, questions):
+    chunks, tokens, recall = [], [], {'lookup': [], 'broad': []}
+    for item in questions:
+        scored_docs = pipeline.retrieve(item['question'])
+        retrieved = {doc.metadata['id'] for doc, _ in scored_docs}
+        chunks.append(len(scored_docs))
+        tokens.append(count_tokens(pipeline.qa_prompt.format(
+            context="\n\n".join(doc.page_content for doc, _ in scored_docs),
+            question=item['question']
+        )))
+        recall[item['type']].append(len(retrieved & set(item['expected'])) / len(item['expected']))
+
+    every = recall['lookup'] + recall['broad']
+    return {
+        'chunks': np.mean(chunks),
+        'tokens': np.mean(tokens),
+        'recall': np.mean(every),
+        'lookup_recall': np.mean(recall['lookup']),
+        'broad_recall': np.mean(recall['broad'])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--embeddings', choices=['tfidf', 'openai'],
+                        default='openai' if os.environ.get('OPENAI_API_KEY') else 'tfidf')
+    args = parser.parse_args()
+
+    with open(EVAL_SET) as f:
+        eval_set = json.load(f)
+
+    if args.embeddings == 'openai':
+        from langchain_community.embeddings import OpenAIEmbeddings
+        embeddings = OpenAIEmbeddings()
+    else:
+        embeddings = TfidfEmbeddings([chunk['text'] for chunk in eval_set['chunks']])
+
+    rag_pipeline.OpenAI = StubLLM
+    pipeline = RAGPipeline(EvalVectorStore(eval_set['chunks'], embeddings))
+    k = Config.RETRIEVAL_K
+
+    rows = []
+    with retrieval_config(RETRIEVAL_MODE='fixed'):
+        rows.append((f"fixed k={k}", evaluate(pipeline, eval_set['questions'])))
+    for threshold, spread in itertools.product(THRESHOLDS, SPREADS):
+        with retrieval_config(RETRIEVAL_MODE='adaptive', RETRIEVAL_SCORE_THRESHOLD=threshold,
+                              RETRIEVAL_FLAT_SPREAD=spread):
+            rows.append((f"adaptive t={threshold} s={spread}", evaluate(pipeline, eval_set['questions'])))
+
+    print(f"Embeddings: {args.embeddings}; token counts: {TOKENIZER}; "
+          f"{len(eval_set['questions'])} questions, k={k}, max_k={Config.RETRIEVAL_MAX_K}")
+    columns = ['chunks', 'tokens', 'recall', 'lookup_recall', 'broad_recall']
+    print(f"{'setting':<26}" + "".join(f"{column:>15}" for column in columns))
+    for name, metrics in rows:
+        print(f"{name:<26}" + "".join(f"{metrics[column]:>15.2f}" for column in columns))
+
+
+if __name__ == '__main__':
+    main()
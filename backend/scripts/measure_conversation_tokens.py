@@ -0,0 +1,145 @@
+"""Measure prompt tokens per turn over a long conversation.
+
+Drives ConversationMemory and RAGPipeline through a scripted conversation with
+a deterministic stub LLM (no API calls) and reports, per turn, the tokens of
+every prompt the turn sends: condensing the question, answering it, and
+updating the rolling summary. For comparison it also reports a stateless
+baseline (the answer prompt for the bare question, as /chat cost before
+memory existed) and the answer prompt with the full transcript pasted in.
+
+Usage (from backend/):
+    python scripts/measure_conversation_tokens.py [--turns 50]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+
+from config import Config
+from utils import conversation_memory, rag_pipeline
+from utils.conversation_memory import ConversationMemory
+from utils.rag_pipeline import RAGPipeline
+
+
+def load_token_counter():
+    """tiktoken's encoding for the default completion model, or a ~4 chars/token estimate offline"""
+    try:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model('gpt-3.5-turbo-instruct')
+        return lambda text: len(encoding.encode(text)), 'tiktoken'
+    except Exception:
+        return lambda text: max(1, len(text) // 4), 'estimate (4 chars/token; tiktoken encoding unavailable)'
+
+
+count_tokens, TOKENIZER = load_token_counter()
+
+
+class StubLLM:
+    """Deterministic OpenAI stand-in: echoes questions, answers ~80 words, summaries hit the token cap"""
+
+    def __init__(self, *args, max_tokens=256, **kwargs):
+        self.max_tokens = max_tokens
+
+    def invoke(self, prompt):
+        if prompt.rstrip().endswith("Standalone question:"):
+            return prompt.rsplit("Follow-up question:", 1)[1].split("\n", 1)[0].strip()
+        if prompt.rstrip().endswith("Updated summary:"):
+            words = prompt.rsplit("Existing summary:", 1)[1].split()
+            return " ".join(words[-int(self.max_tokens * 0.75):])
+        return " ".join(["The documents describe this in detail."] * 14)
+
+    def get_num_tokens(self, text):
+        return count_tokens(text)
+
+
+class StubVectorStore:
+    """Always retrieves the same three ~1000-character chunks"""
+
+    def __init__(self):
+        self.docs = [
+            (Document(page_content=f"Chunk {i}: " + "quarterly revenue grew across regions. " * 25,
+                      metadata={'source': 'report.pdf', 'page': i}), 0.8)
+            for i in range(3)
+        ]
+
+    def has_documents(self):
+        return True
+
+    def search_with_scores(self, query, k=3):
+        return self.docs[:k]
+
+
+def simulate(turns):
+    conversation_memory.OpenAI = StubLLM
+    rag_pipeline.OpenAI = StubLLM
+    memory = ConversationMemory(
+        max_recent_tokens=Config.MEMORY_RECENT_TOKENS,
+        max_summary_tokens=Config.MEMORY_SUMMARY_TOKENS,
+        max_bytes=Config.MEMORY_MAX_BYTES,
+        max_answer_chars=Config.MEMORY_ANSWER_CHARS
+    )
+    pipeline = RAGPipeline(StubVectorStore())
+    transcript = []
+    rows = []
+
+    for turn in range(1, turns + 1):
+        question = f"Follow-up {turn}: how does that compare with the figures for region {turn % 7}?"
+
+        standalone, condense_tokens = memory.condense_question(question)
+        response = pipeline.query(standalone)
+        summary_tokens = memory.add_turn(question, response['answer'])
+
+        # Baselines: no memory at all, and the whole transcript pasted in front of the question
+        stateless_tokens = count_tokens(pipeline.qa_prompt.format(
+            context="\n\n".join(doc.page_content for doc, _ in pipeline.retrieve(question)),
+            question=question
+        ))
+        naive_question = "\n".join(transcript + [question])
+        naive_tokens = count_tokens(pipeline.qa_prompt.format(
+            context="\n\n".join(doc.page_content for doc, _ in pipeline.retrieve(naive_question)),
+            question=naive_question
+        ))
+        transcript.append(f"User: {question}\nAssistant: {response['answer']}")
+
+        rows.append({
+            'turn': turn,
+            'condense': condense_tokens,
+            'answer': response['prompt_tokens'],
+            'summary': summary_tokens,
+            'total': condense_tokens + response['prompt_tokens'] + summary_tokens,
+            'stateless': stateless_tokens,
+            'full_transcript': naive_tokens,
+            'stored_bytes': memory.get_stats()['stored_bytes']
+        })
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=50)
+    args = parser.parse_args()
+
+    rows = simulate(args.turns)
+    columns = ['turn', 'condense', 'answer', 'summary', 'total', 'stateless', 'full_transcript', 'stored_bytes']
+
+    print(f"Token counts: {TOKENIZER}")
+    print(" ".join(f"{column:>15}" for column in columns))
+    for row in rows:
+        print(" ".join(f"{row[column]:>15}" for column in columns))
+
+    totals = [row['total'] for row in rows]
+    stateless = [row['stateless'] for row in rows]
+    naive = [row['full_transcript'] for row in rows]
+    print(f"\nmean prompt tokens/turn: {sum(totals) / len(totals):.0f} with memory, "
+          f"{sum(stateless) / len(stateless):.0f} stateless, {sum(naive) / len(naive):.0f} with full transcript")
+    print(f"max prompt tokens/turn:  {max(totals)} with memory, {max(stateless)} stateless, "
+          f"{max(naive)} with full transcript")
+    print(f"summary updates: {sum(1 for row in rows if row['summary'])} of {len(rows)} turns")
+
+
+if __name__ == '__main__':
+    main()
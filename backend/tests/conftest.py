@@ -0,0 +1,109 @@
+import os
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+
+# Tests import modules the way app.py does (``from utils...``), relative to backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import conversation_memory, insight_generator, rag_pipeline, vector_store
+
+
+class FakeLLM:
+    """Deterministic stand-in for ``langchain_openai.OpenAI``; one token per word"""
+
+    def __init__(self, *args, **kwargs):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        if prompt.rstrip().endswith("Standalone question:"):
+            return "standalone " + prompt.rsplit("Follow-up question:", 1)[1].split("\n", 1)[0].strip()
+        if prompt.rstrip().endswith("Updated summary:"):
+            return "summary of earlier turns " * 10
+        return "stub answer"
+
+    def get_num_tokens(self, text):
+        return len(text.split())
+
+
+class FakeEmbeddings:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+class FakeCollection:
+    def __init__(self, store):
+        self.store = store
+
+    def update(self, ids, metadatas):
+        for doc_id, metadata in zip(ids, metadatas):
+            self.store.docs[doc_id].metadata = dict(metadata)
+
+
+class FakeChroma:
+    """In-memory stand-in for the Chroma vector store that records store creation"""
+
+    from_documents_calls = 0
+    _calls_lock = threading.Lock()
+
+    def __init__(self):
+        self.docs = {}
+        self.fail_delete = False
+        self._collection = FakeCollection(self)
+
+    @classmethod
+    def from_documents(cls, documents, embedding, ids=None, persist_directory=None, collection_metadata=None):
+        with cls._calls_lock:
+            cls.from_documents_calls += 1
+        # Widen the window a racing second creator would fall into
+        time.sleep(0.01)
+        store = cls()
+        store.add_documents(documents, ids=ids)
+        return store
+
+    def add_documents(self, documents, ids=None):
+        ids = ids or [str(uuid.uuid4()) for _ in documents]
+        time.sleep(0.001)
+        for doc, doc_id in zip(documents, ids):
+            self.docs[doc_id] = doc
+        return ids
+
+    def delete(self, ids=None):
+        if self.fail_delete:
+            raise RuntimeError("delete failed")
+        for doc_id in ids:
+            self.docs.pop(doc_id, None)
+
+    def similarity_search(self, query, k=4):
+        return list(self.docs.values())[:k]
+
+    def similarity_search_with_relevance_scores(self, query, k=4):
+        return [(doc, 0.8) for doc in list(self.docs.values())[:k]]
+
+
+@pytest.fixture(autouse=True)
+def stub_openai(monkeypatch):
+    """Replace every OpenAI / Chroma client the backend constructs"""
+    FakeChroma.from_documents_calls = 0
+    monkeypatch.setattr(vector_store, 'OpenAIEmbeddings', FakeEmbeddings)
+    monkeypatch.setattr(vector_store, 'Chroma', FakeChroma)
+    monkeypatch.setattr(rag_pipeline, 'OpenAI', FakeLLM)
+    monkeypatch.setattr(insight_generator, 'OpenAI', FakeLLM)
+    monkeypatch.setattr(conversation_memory, 'OpenAI', FakeLLM)
+
+
+@pytest.fixture
+def make_document(tmp_path):
+    """Write a .txt file whose paragraphs each become exactly one chunk"""
+
+    def _make_document(name, paragraphs):
+        # 600-char paragraphs: two never fit in one 1000-char chunk, and they exceed the overlap
+        path = tmp_path / name
+        path.write_text("\n\n".join(p.ljust(600, '.') for p in paragraphs))
+        return str(path)
+
+    return _make_document
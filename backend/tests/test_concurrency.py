@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from utils import vector_store
+
+UPLOADERS = 20
+ASKERS = 20
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    # app.py creates its upload folder relative to the working directory on import
+    monkeypatch.chdir(tmp_path)
+    import app
+    app.user_sessions.clear()
+    yield app
+    app.user_sessions.clear()
+
+
+def run_together(targets):
+    """Start all targets at once and re-raise the first error any of them hit"""
+    barrier = threading.Barrier(len(targets))
+    errors = []
+
+    def wrap(target):
+        def run():
+            barrier.wait()
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+        return run
+
+    threads = [threading.Thread(target=wrap(target)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def test_concurrent_uploads_and_questions_share_one_store(app_module, make_document):
+    session_id = 'stress-session'
+    files = [
+        make_document(f"doc{i}.txt", [f"document {i} first part", f"document {i} second part"])
+        for i in range(UPLOADERS)
+    ]
+    results = []
+    answers = []
+
+    def upload(i):
+        def run():
+            chatbot = app_module.get_or_create_session(session_id)
+            results.append(chatbot.process_document(files[i], f"doc{i}.txt"))
+        return run
+
+    def ask():
+        chatbot = app_module.get_or_create_session(session_id)
+        answers.append(chatbot.ask_question("What do the documents say?"))
+
+    run_together([upload(i) for i in range(UPLOADERS)] + [ask for _ in range(ASKERS)])
+
+    chatbot = app_module.user_sessions[session_id]
+    assert len(app_module.user_sessions) == 1
+    assert all(success for success, _ in results)
+    assert len(answers) == ASKERS
+
+    # No lost documents and exactly one Chroma store for the session
+    assert len(chatbot.get_documents()) == UPLOADERS
+    assert sorted(doc['filename'] for doc in chatbot.get_documents()) == sorted(
+        f"doc{i}.txt" for i in range(UPLOADERS))
+    assert vector_store.Chroma.from_documents_calls == 1
+
+    # Chunk-id bookkeeping matches what is actually in the store
+    tracked_ids = set().union(*chatbot.chunk_ids.values())
+    assert len(chatbot.chunk_ids) == UPLOADERS
+    assert all(len(ids) == 2 for ids in chatbot.chunk_ids.values())
+    assert tracked_ids == set(chatbot.vector_store.vectorstore.docs)
+
+    chatbot.cleanup()
+
+
+def test_upload_after_delete_does_not_recreate_store(app_module, make_document):
+    session_id = 'deleted-session'
+    path = make_document("late.txt", ["arrives after the session was deleted"])
+
+    # The upload fetched the chatbot, then the session was deleted before it took the write lock
+    chatbot = app_module.get_or_create_session(session_id)
+    with app_module.sessions_lock:
+        app_module.user_sessions.pop(session_id)
+    chatbot.cleanup()
+
+    success, _ = chatbot.process_document(path, "late.txt")
+
+    assert not success
+    assert vector_store.Chroma.from_documents_calls == 0
+    assert chatbot.vector_store.vectorstore is None
+    assert chatbot.vector_store.temp_dir is None
+    assert chatbot.get_documents() == []
+    assert session_id not in app_module.user_sessions
@@ -0,0 +1,110 @@
+import threading
+
+from models.chatbot import DocumentChatbot
+from utils.conversation_memory import ConversationMemory
+
+
+def summary_calls(memory):
+    return sum(1 for prompt in memory.llm.prompts if prompt.rstrip().endswith("Updated summary:"))
+
+
+def test_fifty_turns_stay_bounded_and_summarize_rarely():
+    memory = ConversationMemory(max_recent_tokens=100, max_summary_tokens=32)
+    prompt_tokens = []
+
+    for turn in range(50):
+        question = f"question {turn} about the quarterly figures for the northern region"
+        _, condense_tokens = memory.condense_question(question)
+        summary_tokens = memory.add_turn(question, "an answer of a dozen or so words about the figures")
+        prompt_tokens.append(condense_tokens + summary_tokens)
+        assert memory.recent_tokens <= 100
+
+    # Hysteresis: folding down to half the budget means a summary every few turns, not every turn
+    assert 0 < summary_calls(memory) <= 50 // 3
+    # Prompt size plateaus instead of growing with the conversation
+    assert max(prompt_tokens[25:]) <= max(prompt_tokens[:25])
+    assert memory.recent_tokens == sum(tokens for _, _, tokens in memory.turns)
+
+
+def test_summarizing_does_not_block_readers():
+    # Three 8-token turns go over a 20-token budget
+    memory = ConversationMemory(max_recent_tokens=20)
+    entered, release = threading.Event(), threading.Event()
+    invoke = memory.llm.invoke
+
+    def blocking_invoke(prompt):
+        if prompt.rstrip().endswith("Updated summary:"):
+            entered.set()
+            release.wait(5)
+        return invoke(prompt)
+
+    memory.llm.invoke = blocking_invoke
+    memory.add_turn("first question here about it", "first answer here")
+    memory.add_turn("second question here about it", "second answer here")
+    writer = threading.Thread(target=memory.add_turn, args=("third question here about it", "third answer here"))
+    writer.start()
+    assert entered.wait(5)
+
+    # Readers get the pre-summary state while the LLM call is in flight
+    context = []
+    reader = threading.Thread(target=lambda: context.append(memory.get_context()))
+    reader.start()
+    reader.join(1)
+    assert context and "first question here" in context[0]
+
+    release.set()
+    writer.join(5)
+    assert memory.summary
+    assert "first question here" not in memory.get_context()
+
+
+def test_byte_cap_is_hard():
+    memory = ConversationMemory(max_recent_tokens=10_000, max_bytes=500)
+
+    for turn in range(20):
+        memory.add_turn(f"question {turn}", "long answer " * 20)
+        assert memory.get_stats()['stored_bytes'] <= 500
+
+
+def test_answer_prompt_omits_history_and_all_prompts_are_counted(make_document):
+    chatbot = DocumentChatbot('memory-session')
+    chatbot.process_document(make_document("report.txt", ["revenue grew"]), "report.txt")
+
+    chatbot.ask_question("How did revenue change?")
+    response = chatbot.ask_question("And why?")
+
+    breakdown = response['prompt_tokens_breakdown']
+    assert breakdown['condense'] > 0
+    assert response['prompt_tokens'] == breakdown['condense'] + breakdown['answer'] + breakdown['summary']
+    assert response['standalone_question'] == "standalone And why?"
+    # The standalone question carries the context; the answer prompt doesn't repeat the transcript
+    assert "How did revenue change?" not in chatbot.rag_pipeline.llm.prompts[-1]
+    chatbot.cleanup()
+
+
+def test_answers_are_stored_clipped():
+    memory = ConversationMemory(max_answer_chars=40)
+
+    memory.add_turn("question", "word " * 100)
+
+    _, answer, _ = memory.turns[0]
+    assert len(answer) <= 44 and answer.endswith(" ...")
+
+
+def test_failed_token_count_keeps_the_answer(make_document):
+    chatbot = DocumentChatbot('tokenizer-session')
+    chatbot.process_document(make_document("report.txt", ["revenue grew"]), "report.txt")
+
+    def broken_tokenizer(text):
+        raise RuntimeError("encoding unavailable")
+
+    chatbot.rag_pipeline.llm.get_num_tokens = broken_tokenizer
+    chatbot.memory.llm.get_num_tokens = broken_tokenizer
+    chatbot.ask_question("How did revenue change?")
+    response = chatbot.ask_question("And why?")
+
+    assert response['answer'] == "stub answer"
+    assert response['prompt_tokens'] is None
+    # Memory falls back to an estimate so its budget keeps working
+    assert chatbot.memory.recent_tokens > 0
+    chatbot.cleanup()
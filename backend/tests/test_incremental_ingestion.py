@@ -0,0 +1,100 @@
+from langchain_core.documents import Document
+import pytest
+
+from models.chatbot import DocumentChatbot
+from utils.document_processor import DocumentProcessor
+
+
+@pytest.fixture
+def chatbot():
+    chatbot = DocumentChatbot('ingestion-session')
+    yield chatbot
+    chatbot.cleanup()
+
+
+def stored_ids(chatbot):
+    return set(chatbot.vector_store.vectorstore.docs)
+
+
+def test_identical_reupload_reuses_everything(chatbot, make_document):
+    path = make_document("report.txt", ["alpha", "beta"])
+
+    success, first = chatbot.process_document(path, "report.txt")
+    llm_calls = len(chatbot.insight_generator.llm.prompts)
+    success_again, second = chatbot.process_document(path, "report.txt")
+
+    assert success and success_again
+    assert first['ingestion'] == {'version': 1, 'embeddings_reused': 0,
+                                  'embeddings_computed': 2, 'chunks_removed': 0}
+    assert second['ingestion'] == {'version': 1, 'embeddings_reused': 2,
+                                   'embeddings_computed': 0, 'chunks_removed': 0}
+    # Unchanged document: previous insights reused, no new LLM call
+    assert len(chatbot.insight_generator.llm.prompts) == llm_calls
+    assert len(chatbot.get_documents()) == 1
+    assert stored_ids(chatbot) == chatbot.chunk_ids["report.txt"]
+
+
+def test_edited_reupload_embeds_only_changes(chatbot, make_document):
+    chatbot.process_document(make_document("v1.txt", ["alpha", "beta"]), "report.txt")
+    old_ids = set(chatbot.chunk_ids["report.txt"])
+
+    success, result = chatbot.process_document(make_document("v2.txt", ["alpha", "gamma"]), "report.txt")
+
+    assert success
+    assert result['ingestion'] == {'version': 2, 'embeddings_reused': 1,
+                                   'embeddings_computed': 1, 'chunks_removed': 1}
+    new_ids = chatbot.chunk_ids["report.txt"]
+    assert len(old_ids & new_ids) == 1
+    assert stored_ids(chatbot) == new_ids
+    assert [doc['version'] for doc in chatbot.get_documents()] == [2]
+
+
+def test_failed_delete_keeps_tracking_stale_chunks(chatbot, make_document):
+    chatbot.process_document(make_document("v1.txt", ["alpha", "beta"]), "report.txt")
+    old_ids = set(chatbot.chunk_ids["report.txt"])
+    chatbot.vector_store.vectorstore.fail_delete = True
+
+    success, _ = chatbot.process_document(make_document("v2.txt", ["alpha", "gamma"]), "report.txt")
+
+    assert not success
+    # Nothing was deleted, and the bookkeeping still covers the stale chunk
+    assert old_ids <= stored_ids(chatbot)
+    assert chatbot.chunk_ids["report.txt"] == stored_ids(chatbot)
+    assert len(chatbot.chunk_ids["report.txt"]) == 3
+
+    # The next upload retries the removal
+    chatbot.vector_store.vectorstore.fail_delete = False
+    success, result = chatbot.process_document(make_document("v3.txt", ["alpha", "gamma"]), "report.txt")
+
+    assert success
+    assert result['ingestion']['embeddings_computed'] == 0
+    assert result['ingestion']['chunks_removed'] == 1
+    assert stored_ids(chatbot) == chatbot.chunk_ids["report.txt"]
+    assert len(stored_ids(chatbot)) == 2
+
+
+def test_reused_chunk_gets_new_page_metadata(chatbot, monkeypatch):
+    def pdf_pages(*contents):
+        texts = []
+        for page, content in enumerate(contents):
+            texts.append(Document(page_content=content, metadata={
+                'source': "paper.pdf",
+                'page': page,
+                'chunk_hash': DocumentProcessor.hash_chunk(content)
+            }))
+        return True, texts
+
+    monkeypatch.setattr(chatbot.document_processor, 'process_file',
+                        lambda file_path, filename: pdf_pages("intro", "method"))
+    chatbot.process_document("unused.pdf", "paper.pdf")
+
+    # A new first page pushes the existing chunks down one page
+    monkeypatch.setattr(chatbot.document_processor, 'process_file',
+                        lambda file_path, filename: pdf_pages("abstract", "intro", "method"))
+    success, result = chatbot.process_document("unused.pdf", "paper.pdf")
+
+    assert success
+    assert result['ingestion']['embeddings_computed'] == 1
+    pages = {doc.page_content: doc.metadata['page']
+             for doc in chatbot.vector_store.vectorstore.docs.values()}
+    assert pages == {"abstract": 0, "intro": 1, "method": 2}
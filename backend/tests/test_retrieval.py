@@ -0,0 +1,85 @@
+from langchain_core.documents import Document
+import pytest
+
+from config import Config
+from utils.rag_pipeline import RAGPipeline
+
+
+class ScoredVectorStore:
+    """Returns chunks with preset relevance scores, best first"""
+
+    def __init__(self, scores):
+        self.scored = [(Document(page_content=f"chunk {i}", metadata={'source': 'a.txt'}), score)
+                       for i, score in enumerate(scores)]
+
+    def has_documents(self):
+        return True
+
+    def search_with_scores(self, query, k=3):
+        return self.scored[:k]
+
+    def search(self, query, k=3):
+        return [doc for doc, _ in self.scored[:k]]
+
+
+@pytest.fixture
+def adaptive(monkeypatch):
+    monkeypatch.setattr(Config, 'RETRIEVAL_MODE', 'adaptive')
+    monkeypatch.setattr(Config, 'RETRIEVAL_K', 3)
+    monkeypatch.setattr(Config, 'RETRIEVAL_MAX_K', 8)
+    monkeypatch.setattr(Config, 'RETRIEVAL_SCORE_THRESHOLD', 0.5)
+    monkeypatch.setattr(Config, 'RETRIEVAL_FLAT_SPREAD', 0.1)
+
+
+def retrieved(scores, k=None):
+    return [doc.page_content for doc, _ in RAGPipeline(ScoredVectorStore(scores)).retrieve("q", k=k)]
+
+
+def chunks(n):
+    return [f"chunk {i}" for i in range(n)]
+
+
+def test_fixed_mode_uses_retrieval_k(monkeypatch):
+    monkeypatch.setattr(Config, 'RETRIEVAL_MODE', 'fixed')
+    monkeypatch.setattr(Config, 'RETRIEVAL_K', 2)
+    pipeline = RAGPipeline(ScoredVectorStore([0.9, 0.2, 0.1]))
+
+    assert [doc.page_content for doc, _ in pipeline.retrieve("q")] == chunks(2)
+    assert len(pipeline.get_relevant_documents("q")) == 2
+
+
+def test_adaptive_sends_a_clear_winner_alone(adaptive):
+    assert retrieved([0.95, 0.6, 0.55, 0.54, 0.53, 0.52, 0.51, 0.50], k=1) == chunks(1)
+    assert retrieved([0.95, 0.6, 0.55, 0.54, 0.53, 0.52, 0.51, 0.50]) == chunks(1)
+
+
+def test_adaptive_does_not_expand_from_a_single_chunk(adaptive):
+    # With k=1 the top-k spread is trivially 0; flatness must be judged against the next candidate
+    assert retrieved([0.95, 0.80, 0.75, 0.70, 0.65, 0.60, 0.55, 0.50], k=1) == chunks(1)
+
+
+def test_adaptive_flat_top_followed_by_a_cliff(adaptive):
+    assert retrieved([0.80, 0.79, 0.78, 0.55, 0.52, 0.51, 0.50, 0.50]) == chunks(3)
+
+
+def test_adaptive_expands_only_to_candidates_near_the_best(adaptive):
+    scores = [0.80, 0.797, 0.795, 0.793, 0.79, 0.60, 0.52, 0.50]
+
+    assert retrieved(scores) == chunks(5)
+
+
+def test_adaptive_is_independent_of_the_score_band(adaptive):
+    scores = [0.9, 0.7, 0.65, 0.4, 0.3, 0.2, 0.1, 0.0]
+    narrow_band = [0.70 + 0.08 * score for score in scores]
+
+    assert retrieved(narrow_band) == retrieved(scores) == chunks(3)
+
+
+def test_adaptive_small_store_falls_back_to_top_k(adaptive):
+    assert retrieved([0.9, 0.3]) == chunks(2)
+
+
+def test_sources_carry_scores(adaptive):
+    response = RAGPipeline(ScoredVectorStore([0.91234, 0.7])).query("q")
+
+    assert [source['score'] for source in response['sources']] == [0.9123, 0.7]
@@ -0,0 +1,188 @@
+from collections import deque
+from langchain_openai import OpenAI
+from langchain_core.prompts import PromptTemplate
+import threading
+import logging
+
+class ConversationMemory:
+    """Per-session chat history kept as a rolling summary plus recent turns.
+
+    Recent turns are kept verbatim, with answers clipped to their first
+    ``max_answer_chars`` characters, until they exceed ``max_recent_tokens``;
+    the oldest are then folded into a summary capped at
+    ``max_summary_tokens``, down to half the budget so the summary LLM call
+    runs every few turns rather than every turn. ``max_bytes`` is a hard cap
+    on the stored history (turns plus summary), enforced after every turn.
+    """
+
+    def __init__(self, max_recent_tokens=300, max_summary_tokens=128, max_bytes=64 * 1024,
+                 max_answer_chars=300, temperature=0):
+        self.llm = OpenAI(temperature=temperature, max_tokens=max_summary_tokens)
+        self.max_recent_tokens = max_recent_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.max_bytes = max_bytes
+        self.max_answer_chars = max_answer_chars
+        self.summary = ""
+        self.turns = deque()  # (question, answer, token count)
+        self.recent_tokens = 0
+        # Guards the state above; held only briefly so readers never wait on the LLM
+        self.lock = threading.Lock()
+        # Serializes add_turn so concurrent summarizations don't overwrite each other
+        self.update_lock = threading.Lock()
+
+        self.condense_prompt = PromptTemplate.from_template(
+            """Given the conversation so far and a follow-up question, rewrite the follow-up
+            as a short standalone question that can be understood without the conversation.
+            Do not answer it.
+
+            Conversation:
+            {history}
+
+            Follow-up question: {question}
+
+            Standalone question:"""
+        )
+
+        self.summary_prompt = PromptTemplate.from_template(
+            """Progressively summarize the conversation about the user's documents, adding the
+            new turns to the existing summary. Keep facts, names and numbers the user may refer
+            back to; drop pleasantries. Keep it under {max_words} words.
+
+            Existing summary: {summary}
+
+            New turns:
+            {turns}
+
+            Updated summary:"""
+        )
+
+    def condense_question(self, question):
+        """Rewrite a follow-up question into a standalone retrieval query.
+
+        Returns the standalone question and the prompt tokens spent on it.
+        """
+        history = self.get_context()
+        if not history:
+            return question, 0
+
+        prompt = self.condense_prompt.format(history=history, question=question)
+        try:
+            standalone = self.llm.invoke(prompt).strip()
+        except Exception as e:
+            logging.error(f"Error condensing question: {str(e)}")
+            return question, 0
+        return standalone or question, self._count_tokens(prompt)
+
+    def get_context(self):
+        """Return the summary and recent turns formatted for a prompt"""
+        with self.lock:
+            parts = []
+            if self.summary:
+                parts.append(f"Summary of earlier conversation: {self.summary}")
+            parts.extend(self._format_turn(turn) for turn in self.turns)
+            return "\n".join(parts)
+
+    def add_turn(self, question, answer):
+        """Record a question/answer pair, folding old turns into the summary when over budget.
+
+        Returns the prompt tokens spent updating the summary (0 on most turns).
+        """
+        answer = self._clip(answer)
+        tokens = self._count_tokens(f"{question}\n{answer}")
+        prompt_tokens = 0
+
+        with self.update_lock:
+            with self.lock:
+                self.turns.append((question, answer, tokens))
+                self.recent_tokens += tokens
+                folded = self._turns_to_fold()
+                summary = self.summary
+
+            if folded:
+                # Summarize without holding self.lock; the folded turns stay visible until the swap
+                summary, prompt_tokens = self._summarize(summary, folded)
+                with self.lock:
+                    for _ in folded:
+                        self.recent_tokens -= self.turns.popleft()[2]
+                    self.summary = summary
+
+            with self.lock:
+                self._enforce_byte_cap()
+
+        return prompt_tokens
+
+    def clear(self):
+        """Forget the whole conversation"""
+        with self.lock:
+            self.summary = ""
+            self.turns.clear()
+            self.recent_tokens = 0
+
+    def get_stats(self):
+        """Get memory usage of this conversation"""
+        with self.lock:
+            return {
+                'recent_turns': len(self.turns),
+                'recent_tokens': self.recent_tokens,
+                'summary_tokens': self._count_tokens(self.summary) if self.summary else 0,
+                'stored_bytes': self._stored_bytes()
+            }
+
+    def _turns_to_fold(self):
+        """Oldest turns to summarize once over budget, leaving half the budget (and the latest turn)"""
+        if self.recent_tokens <= self.max_recent_tokens:
+            return []
+
+        folded = []
+        remaining = self.recent_tokens
+        for turn in list(self.turns)[:-1]:
+            if remaining <= self.max_recent_tokens // 2:
+                break
+            folded.append(turn)
+            remaining -= turn[2]
+        return folded
+
+    def _summarize(self, summary, turns):
+        """Merge folded turns into the rolling summary; returns (summary, prompt tokens)"""
+        prompt = self.summary_prompt.format(
+            summary=summary or "(none)",
+            turns="\n".join(self._format_turn(turn) for turn in turns),
+            max_words=int(self.max_summary_tokens * 0.75)
+        )
+        try:
+            new_summary = self.llm.invoke(prompt).strip()
+        except Exception as e:
+            # Keep the old summary; the folded turns are dropped to stay within budget
+            logging.error(f"Error summarizing conversation: {str(e)}")
+            return summary, 0
+        return new_summary, self._count_tokens(prompt)
+
+    def _count_tokens(self, text):
+        """Token count via the LLM's tokenizer, estimated at ~4 chars/token if it is unavailable"""
+        try:
+            return self.llm.get_num_tokens(text)
+        except Exception as e:
+            logging.warning(f"Unable to count tokens, estimating: {str(e)}")
+            return max(1, len(text) // 4)
+
+    def _clip(self, answer):
+        """Keep the opening of an answer; enough to resolve follow-ups without replaying it whole"""
+        if len(answer) <= self.max_answer_chars:
+            return answer
+        return answer[:self.max_answer_chars].rsplit(' ', 1)[0] + " ..."
+
+    def _enforce_byte_cap(self):
+        """Drop the oldest turns, then trim the summary, until within max_bytes"""
+        while self.turns and self._stored_bytes() > self.max_bytes:
+            self.recent_tokens -= self.turns.popleft()[2]
+
+        if self._stored_bytes() > self.max_bytes:
+            self.summary = self.summary.encode('utf-8')[:self.max_bytes].decode('utf-8', 'ignore')
+
+    def _stored_bytes(self):
+        return len(self.summary.encode('utf-8')) + sum(
+            len(question.encode('utf-8')) + len(answer.encode('utf-8')) for question, answer, _ in self.turns)
+
+    def _format_turn(self, turn):
+        question, answer, _ = turn
+        return f"User: {question}\nAssistant: {answer}"
@@ -1,4 +1,5 @@
 from datetime import datetime
+import hashlib
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 import logging
@@ -29,6 +30,7 @@ class DocumentProcessor:
             for text in texts:
                 text.metadata['source'] = filename
                 text.metadata['upload_time'] = datetime.now().isoformat()
+                text.metadata['chunk_hash'] = self.hash_chunk(text.page_content)
             
             return True, texts
             
@@ -36,6 +38,11 @@ class DocumentProcessor:
             logging.error(f"Error processing file {filename}: {str(e)}")
             return False, f"Error processing file: {str(e)}"
     
+    @staticmethod
+    def hash_chunk(content):
+        """Stable content hash used to detect unchanged chunks on re-upload"""
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
     def get_supported_extensions(self):
         """Get list of supported file extensions"""
         return ['txt', 'pdf', 'docx']
\ No newline at end of file
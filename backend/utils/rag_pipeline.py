@@ -1,8 +1,6 @@
 from langchain_openai import OpenAI
-from langchain.chains import RetrievalQA
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import PromptTemplate
+from config import Config
 import logging
 
 class RAGPipeline:
@@ -10,55 +8,108 @@ class RAGPipeline:
         self.vector_store = vector_store
         self.llm = OpenAI(temperature=temperature)
         
-    def query(self, question, k=3):
+        # Same wording as LangChain's default "stuff" QA prompt
+        self.qa_prompt = PromptTemplate.from_template(
+            """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Question: {question}
+Helpful Answer:"""
+        )
+        
+    def query(self, question, k=None):
         """Query the RAG pipeline with a question"""
         if not self.vector_store.has_documents():
             return "No documents available for querying."
         
         try:
-            # Get retriever
-            retriever = self.vector_store.get_retriever(search_kwargs={"k": k})
+            # Get scored chunks to stuff into the prompt
+            scored_docs = self.retrieve(question, k=k)
             
-            if retriever is None:
+            if not scored_docs:
                 return "Unable to retrieve documents."
             
-            # Create QA chain with invoke method
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
-                chain_type="stuff",
-                retriever=retriever,
-                return_source_documents=True
-            )
-            
-            # Get answer using invoke method
-            result = qa_chain.invoke({"query": question})
+            # "Stuff" the retrieved chunks into a single prompt
+            context = "\n\n".join(doc.page_content for doc, _ in scored_docs)
+            formatted_prompt = self.qa_prompt.format(context=context, question=question)
+            answer = self.llm.invoke(formatted_prompt)
             
             # Format response with sources
             sources = []
-            for doc in result.get('source_documents', []):
+            for doc, score in scored_docs:
                 sources.append({
                     'content': doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
                     'source': doc.metadata.get('source', 'Unknown'),
-                    'page': doc.metadata.get('page', 'N/A')
+                    'page': doc.metadata.get('page', 'N/A'),
+                    'score': round(score, 4)
                 })
             
             return {
-                'answer': result['result'],
+                'answer': answer,
                 'sources': sources,
-                'question': question
+                'question': question,
+                'prompt_tokens': self._count_tokens(formatted_prompt)
             }
             
         except Exception as e:
             logging.error(f"Error in RAG pipeline: {str(e)}")
             return f"Error processing question: {str(e)}"
     
-    def get_relevant_documents(self, query, k=3):
+    def _count_tokens(self, text):
+        """Token count of a prompt, or None if the tokenizer is unavailable"""
+        try:
+            return self.llm.get_num_tokens(text)
+        except Exception as e:
+            logging.warning(f"Unable to count prompt tokens: {str(e)}")
+            return None
+    
+    def retrieve(self, question, k=None):
+        """Retrieve (document, relevance score) pairs for a question.
+
+        In "fixed" mode this is plain top-k. In "adaptive" mode
+        RETRIEVAL_MAX_K candidates are fetched and each is scored relative to
+        the pool: 1.0 for the best candidate, 0.0 for the weakest. Absolute
+        similarities from OpenAI embeddings sit in a narrow band, so cutoffs on
+        them either drop nothing or everything; relative ones do not.
+
+        - Candidates below RETRIEVAL_SCORE_THRESHOLD (relative) are dropped,
+          so a clear winner is sent on its own.
+        - More than k are kept only when the next candidate after the top k is
+          within RETRIEVAL_FLAT_SPREAD (relative) of the best one, and then
+          only candidates that close to the best.
+        """
+        k = k or Config.RETRIEVAL_K
+        
+        if Config.RETRIEVAL_MODE != 'adaptive':
+            return self.vector_store.search_with_scores(question, k=k)
+        
+        candidates = self.vector_store.search_with_scores(question, k=max(k, Config.RETRIEVAL_MAX_K))
+        if len(candidates) < Config.RETRIEVAL_MAX_K:
+            # Too few chunks to tell relevant ones from background; the whole store is small anyway
+            return candidates[:k]
+        
+        best, weakest = candidates[0][1], candidates[-1][1]
+        
+        def strength(score):
+            return (score - weakest) / (best - weakest) if best > weakest else 1.0
+        
+        relevant = [(doc, score) for doc, score in candidates
+                    if strength(score) >= Config.RETRIEVAL_SCORE_THRESHOLD]
+        
+        if len(relevant) > k and 1.0 - strength(relevant[k][1]) <= Config.RETRIEVAL_FLAT_SPREAD:
+            return [(doc, score) for doc, score in relevant
+                    if 1.0 - strength(score) <= Config.RETRIEVAL_FLAT_SPREAD]
+        
+        return relevant[:k]
+    
+    def get_relevant_documents(self, query, k=None):
         """Get relevant documents without generating answer"""
         if not self.vector_store.has_documents():
             return []
         
         try:
-            return self.vector_store.search(query, k=k)
+            return self.vector_store.search(query, k=k or Config.RETRIEVAL_K)
         except Exception as e:
             logging.error(f"Error retrieving documents: {str(e)}")
             return []
\ No newline at end of file
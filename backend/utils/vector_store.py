@@ -12,8 +12,11 @@ class VectorStore:
         self.vectorstore = None
         self.temp_dir = None
         
-    def add_documents(self, texts):
-        """Add documents to vector store"""
+    def add_documents(self, texts, ids=None):
+        """Add documents to vector store, optionally under explicit ids"""
+        if not texts:
+            return True
+        
         try:
             if self.vectorstore is None:
                 # Create temporary directory for non-persistent storage
@@ -23,11 +26,14 @@ class VectorStore:
                 self.vectorstore = Chroma.from_documents(
                     texts,
                     self.embeddings,
-                    persist_directory=self.temp_dir
+                    ids=ids,
+                    persist_directory=self.temp_dir,
+                    # Cosine relevance scores (cosine similarity) instead of the L2 default
+                    collection_metadata={"hnsw:space": "cosine"}
                 )
             else:
                 # Add documents to existing vector store
-                self.vectorstore.add_documents(texts)
+                self.vectorstore.add_documents(texts, ids=ids)
                 
             return True
             
@@ -35,6 +41,31 @@ class VectorStore:
             logging.error(f"Error adding documents to vector store: {str(e)}")
             return False
     
+    def delete_documents(self, ids):
+        """Remove documents from vector store by id"""
+        if self.vectorstore is None or not ids:
+            return True
+        
+        try:
+            self.vectorstore.delete(ids=list(ids))
+            return True
+        except Exception as e:
+            logging.error(f"Error deleting documents from vector store: {str(e)}")
+            return False
+    
+    def update_metadata(self, ids, metadatas):
+        """Replace the metadata of stored documents without re-embedding them"""
+        if self.vectorstore is None or not ids:
+            return True
+        
+        try:
+            # Chroma.update_documents would re-embed; the collection updates metadata only
+            self.vectorstore._collection.update(ids=list(ids), metadatas=list(metadatas))
+            return True
+        except Exception as e:
+            logging.error(f"Error updating document metadata in vector store: {str(e)}")
+            return False
+    
     def search(self, query, k=3):
         """Search for similar documents"""
         if self.vectorstore is None:
@@ -46,15 +77,20 @@ class VectorStore:
             logging.error(f"Error searching vector store: {str(e)}")
             return []
     
-    def get_retriever(self, search_kwargs=None):
-        """Get retriever for RAG pipeline"""
+    def search_with_scores(self, query, k=3):
+        """Search for similar documents, returning (document, relevance score) pairs.
+
+        Scores are normalized to [0, 1], higher meaning more relevant, and
+        results are ordered best first.
+        """
         if self.vectorstore is None:
-            return None
+            return []
         
-        if search_kwargs is None:
-            search_kwargs = {"k": 3}
-            
-        return self.vectorstore.as_retriever(search_kwargs=search_kwargs)
+        try:
+            return self.vectorstore.similarity_search_with_relevance_scores(query, k=k)
+        except Exception as e:
+            logging.error(f"Error searching vector store: {str(e)}")
+            return []
     
     def has_documents(self):
         """Check if vector store has documents"""